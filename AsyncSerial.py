@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libraries
+import asyncio
+import logging
+
+import serial_asyncio
+
+# Import OpenMote libraries
+from SerialReceiver import SerialReceiver, MAX_RECEIVE_QUEUE
+
+# Import logging configuration
+logger = logging.getLogger(__name__)
+
+# Opens a serial port on the running event loop and returns its AsyncSerial
+# Many serial ports can share the same event loop (and thread)
+async def open_serial(name = None, baudrate = None):
+    assert name     != None, logger.error("Serial port not defined.")
+    assert baudrate != None, logger.error("Serial baudrate not defined.")
+
+    logger.info("open_serial: Opening the serial port on {} at {} bps.".format(name, baudrate))
+
+    loop = asyncio.get_running_loop()
+    transport, protocol = await serial_asyncio.create_serial_connection(loop, AsyncSerial, name, baudrate = baudrate)
+
+    return protocol
+
+class AsyncSerial(asyncio.Protocol, SerialReceiver):
+
+    def __init__(self):
+        logger.info('init: Creating the AsyncSerial object.')
+
+        # Call constructor, the receiver creates the HDLC driver and framer
+        SerialReceiver.__init__(self, asyncio.Queue(maxsize = MAX_RECEIVE_QUEUE))
+
+        # Serial transport
+        self.transport = None
+
+    def connection_made(self, transport):
+        logger.info("connection_made: Serial port opened.")
+
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        logger.info("connection_lost: Serial port closed.")
+
+        self.transport = None
+
+    # Called by the event loop with the bytes received from the serial port
+    def data_received(self, data):
+        # Find the HDLC frames in the received bytes
+        self.framer.find_frames(data)
+
+    # Stops the serial port
+    def stop(self):
+        logger.info("stop: Stopping the serial port.")
+
+        if (self.transport != None):
+            self.transport.close()
+
+    # Receive a message
+    async def receive(self, timeout = 0.1):
+        message = bytearray()
+        length  = -1
+
+        # Try to receive a message with timeout
+        try:
+            message = await asyncio.wait_for(self.receive_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            length = len(message)
+
+            logger.info("receive: Received a message with {} bytes.".format(length))
+
+        # Return the received message and length
+        return (message, length)
+
+    # Transmit a message
+    def transmit(self, message):
+        logger.info("transmit: Got a message to transmit with {} bytes.".format(len(message)))
+
+        # Compute statistics
+        self.tx_total_frames += 1
+
+        try:
+            # HDLCify the message
+            transmit_buffer = self.hdlc.hdlcify(message)
+
+            # Send the message through the serial transport (buffered)
+            self.transport.write(transmit_buffer)
+        except:
+            logger.error("transmit: Error HDLCifying or transmitting the transmit buffer.", exc_info = True)
+            # Compute statistics
+            self.tx_bad_frames += 1
+            raise
+
+        # Compute statistics
+        self.tx_good_frames += 1
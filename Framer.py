@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libraries
+import logging
+
+# Import OpenMote libraries
+from Hdlc import Hdlc
+
+# Import logging configuration
+logger = logging.getLogger(__name__)
+
+# Maximum HDLC frame length, used to pre-allocate the receive buffer
+MAX_HDLC_FRAME = 2048
+
+# HDLC flag as an int, to compare with the received bytes, and as bytes, to
+# find it in the received bytes
+FLAG_INT   = 0x7E
+FLAG_BYTES = b'\x7e'
+
+# Finds the HDLC frames in a stream of received bytes
+# Each complete frame, including its HDLC flags, is passed to the callback as
+# a memoryview that is only valid during the call
+# Frames longer than MAX_HDLC_FRAME are dropped and reported to error_callback
+class Framer(object):
+
+    def __init__(self, callback = None, error_callback = None):
+        assert callback != None, logger.error("Framer callback not defined.")
+
+        self.callback       = callback
+        self.error_callback = error_callback
+
+        # Check the HDLC flag matches the HDLC driver
+        assert Hdlc.HDLC_FLAG == FLAG_INT, logger.error("Framer HDLC flag does not match.")
+
+        # Receive variables
+        self.receive_buffer = bytearray(MAX_HDLC_FRAME)
+        self.receive_length = 0
+        self.is_receiving   = False
+        self.frame_start    = None
+        self.last_rx_byte   = b''
+        self.is_debug       = logger.isEnabledFor(logging.DEBUG)
+
+        # Receive handlers, indexed by (is_receiving << 1) | (HDLC flag found)
+        self.receive_handlers = [self.receive_outside_no_flag,
+                                 self.receive_outside_flag,
+                                 self.receive_inside_no_flag,
+                                 self.receive_inside_flag]
+
+    # Scans the received bytes and calls the callback for every complete frame
+    def find_frames(self, rx_bytes):
+        if (not rx_bytes):
+            return
+
+        # Start of frame, the previous chunk ended with an HDLC flag
+        if ((not self.is_receiving) and
+            (self.last_rx_byte == FLAG_BYTES) and
+            (rx_bytes[0] != FLAG_INT)):
+            self.receive_start()
+
+        # Save the last received byte once per chunk, a closing HDLC flag
+        # at the end of the chunk clears it as it does not open a frame
+        self.last_rx_byte = rx_bytes[-1:]
+
+        # Scan the received bytes for HDLC flags, dispatching each segment
+        # on the receive state and whether an HDLC flag was found
+        rx_view  = memoryview(rx_bytes)
+        find     = rx_bytes.find
+        flag     = FLAG_BYTES
+        handlers = self.receive_handlers
+        start = 0
+        end   = len(rx_bytes)
+        while (start < end):
+            index = find(flag, start)
+            start = handlers[(self.is_receiving << 1) | (index >= 0)](rx_view, start, end, index)
+
+    # Start of HDLC frame, with the opening HDLC flag at frame_start in the
+    # current chunk, or at the end of the previous chunk if None
+    def receive_start(self, frame_start = None):
+        self.is_debug = logger.isEnabledFor(logging.DEBUG)
+        if (self.is_debug):
+            logger.debug("find_frames: Start of HDLC frame.")
+
+        # Keep the opening HDLC flag from the previous chunk in the buffer
+        if (frame_start == None):
+            self.receive_buffer[0] = FLAG_INT
+            self.receive_length = 1
+
+        self.frame_start  = frame_start
+        self.is_receiving = True
+
+    # Outside of HDLC frame without HDLC flag, discard the bytes
+    def receive_outside_no_flag(self, rx_view, start, end, index):
+        return end
+
+    # Outside of HDLC frame with HDLC flag, it may open a frame
+    def receive_outside_flag(self, rx_view, start, end, index):
+        # Start of frame, the HDLC flag is followed by another byte
+        if ((index + 1 < end) and
+            (rx_view[index + 1] != FLAG_INT)):
+            self.receive_start(index)
+
+        return index + 1
+
+    # HDLC frame too long, drop it and wait for the next HDLC flag
+    def receive_overflow(self):
+        logger.warning("find_frames: HDLC frame longer than {} bytes, dropping it.".format(MAX_HDLC_FRAME))
+
+        # Reset the variables
+        self.is_receiving   = False
+        self.frame_start    = None
+        self.receive_length = 0
+
+        if (self.error_callback != None):
+            self.error_callback()
+
+    # Middle of HDLC frame, keep the remaining bytes
+    def receive_inside_no_flag(self, rx_view, start, end, index):
+        # Frame started in this chunk, keep it from its opening HDLC flag
+        if (self.frame_start != None):
+            start = self.frame_start
+            self.frame_start = None
+
+        length = self.receive_length + end - start
+        if (length > MAX_HDLC_FRAME):
+            self.receive_overflow()
+            return end
+
+        self.receive_buffer[self.receive_length:length] = rx_view[start:end]
+        self.receive_length = length
+
+        return end
+
+    # End of HDLC frame, receive up to the closing HDLC flag
+    def receive_inside_flag(self, rx_view, start, end, index):
+        self.is_debug = logger.isEnabledFor(logging.DEBUG)
+        if (self.is_debug):
+            logger.debug("find_frames: End of HDLC frame.")
+
+        index += 1
+
+        # A closing HDLC flag at the end of the chunk does not open a frame,
+        # even if the frame is dropped
+        if (index == end):
+            self.last_rx_byte = b''
+
+        if (self.frame_start != None):
+            length = index - self.frame_start
+        else:
+            length = self.receive_length + index - start
+
+        if (length > MAX_HDLC_FRAME):
+            self.receive_overflow()
+            return index
+
+        # Frame started in this chunk, hand it over without copying it
+        if (self.frame_start != None):
+            frame = rx_view[self.frame_start:index]
+            self.frame_start = None
+
+        # Frame started in a previous chunk, complete it in the buffer
+        else:
+            self.receive_buffer[self.receive_length:length] = rx_view[start:index]
+            frame = memoryview(self.receive_buffer)[:length]
+
+        # Reset the variables
+        self.is_receiving = False
+
+        # Hand the frame over, the buffer is reset even if the callback fails
+        try:
+            self.callback(frame)
+        finally:
+            self.receive_length = 0
+
+        return index
@@ -20,13 +20,30 @@ class Hdlc(object):
     def __init__(self):
         pass
     
+    # Returns the maximum length of the HDLC frame of a buffer, with every byte
+    # and the CRC checksum escaped, plus the HDLC flags
+    def hdlcify_length(self, input = None):
+        return 2 * (len(input) + 2) + 2
+
     # Converts a buffer into an HDLC frame
-    def hdlcify(self, input = None):       
+    def hdlcify(self, input = None):
+        output = bytearray(self.hdlcify_length(input))
+        length = self.hdlcify_into(input, output)
+
+        # Return as bytes, so it is written to the serial port at once
+        del output[length:]
+        return bytes(output)
+
+    # Converts a buffer into an HDLC frame written at the start of output, a
+    # bytearray of at least hdlcify_length(input) bytes that is not resized
+    # Returns the length of the HDLC frame
+    def hdlcify_into(self, input = None, output = None):
         # Check the CRC checksum
         crc_engine = Crc16.Crc16()
 
+        crc_push = crc_engine.push
         for i in input:
-            crc_engine.push(ord(i))
+            crc_push(ord(i))
         crc_result = crc_engine.get()
         
         # Calculate the CRC checksum
@@ -37,48 +54,68 @@ class Hdlc(object):
         input += crc_high
         input += crc_low
 
-        # Create HDLC frame
-        output = []
+        # Bind the constants used per byte to locals
+        flag           = self.HDLC_FLAG
+        flag_escaped   = self.HDLC_FLAG_ESCAPED
+        escape         = self.HDLC_ESCAPE
+        escape_escaped = self.HDLC_ESCAPE_ESCAPED
+
+        # Create HDLC frame, starting with the HDLC flag
+        output[0] = flag
+        length = 1
+
         for i in input:
             i = ord(i)
-            if (i == self.HDLC_FLAG):
-                output.append(self.HDLC_ESCAPE)
-                output.append(self.HDLC_FLAG_ESCAPED)
-            elif (i == self.HDLC_ESCAPE):
-                output.append(self.HDLC_ESCAPE)
-                output.append(self.HDLC_ESCAPE_ESCAPED)
+            if (i == flag):
+                output[length]     = escape
+                output[length + 1] = flag_escaped
+                length += 2
+            elif (i == escape):
+                output[length]     = escape
+                output[length + 1] = escape_escaped
+                length += 2
             else:
-                output.append(i)
+                output[length] = i
+                length += 1
         
-        # Append the HDLC flags
-        output = [self.HDLC_FLAG] + output + [self.HDLC_FLAG]
+        # Append the HDLC flag
+        output[length] = flag
+        length += 1
 
-        return output
+        return length
     
-    # Parses an HDLC frame
-    # Returns the extracted frame or -1 if wrong CRC checksum
+    # Parses an HDLC frame, preferably given as a memoryview so it is not copied
+    # Returns the extracted frame as a bytearray, raises an exception if the
+    # frame is invalid or the CRC checksum is wrong
     def dehdlcify(self, frame = None):
         # Check if the input contains HDLC_FLAG
         assert frame[0] == self.HDLC_FLAG
         assert frame[-1] == self.HDLC_FLAG
 
-        # Remove HDLC header and footer
+        # Remove HDLC header and footer, without copying a memoryview
         frame = frame[1:-1]
 
         # Replace inline HDLC flags
-        output = []
+        output = bytearray()
+
+        # Bind the constants and methods used per byte to locals
+        flag        = self.HDLC_FLAG
+        hdlc_escape = self.HDLC_ESCAPE
+        mask        = self.HDLC_MASK
+        append      = output.append
+
         try:
             escape = False
             for f in frame:
                 if (escape == True):
-                    output.append(f ^ self.HDLC_MASK)
+                    append(f ^ mask)
                     escape = False
                 else:
-                    if (f == self.HDLC_FLAG or
-                        f == self.HDLC_ESCAPE):
+                    if (f == flag or
+                        f == hdlc_escape):
                         escape = True
                     else:
-                        output.append(f)
+                        append(f)
         except:
             logger.error("dehldicfy: Error replacing HDLC flags!")
             raise
@@ -98,8 +135,9 @@ class Hdlc(object):
         # Compute the CRC checksum
         try:
             crc_engine = Crc16.Crc16()
-            for o in output[:-2]:
-                crc_engine.push(o)
+            crc_push = crc_engine.push
+            for o in itertools.islice(output, len(output) - 2):
+                crc_push(o)
             crc_result = crc_engine.get()
             
         except:
@@ -112,6 +150,6 @@ class Hdlc(object):
             raise
         
         # Remove the CRC checksum
-        output = output[:-2]
+        del output[-2:]
         
         return output
@@ -3,17 +3,20 @@
 # Import Python libraries
 import serial
 import threading
-import time
+import queue
 import logging
+import os
+import io
 import binascii
 
 # Import OpenMote libraries
-from Hdlc import Hdlc
+from Framer import MAX_HDLC_FRAME
+from SerialReceiver import SerialReceiver, MAX_RECEIVE_QUEUE
 
 # Import logging configuration
 logger = logging.getLogger(__name__)
 
-class Serial(threading.Thread):
+class Serial(threading.Thread, SerialReceiver):
     
     def __init__(self, name = None, baudrate = None, timeout = 0.1):
         assert name     != None, logger.error("Serial port not defined.")
@@ -21,41 +24,23 @@ class Serial(threading.Thread):
         
         logger.info('init: Creating the Serial object.')
         
-        # Call constructor
+        # Call constructors, the receiver creates the HDLC driver and framer
         threading.Thread.__init__(self)
+        SerialReceiver.__init__(self, queue.Queue(maxsize = MAX_RECEIVE_QUEUE))
         
         # Terminate thread event
         self.stop_event = threading.Event()
         
         # Serial port
         self.serial_port = None
+        self.serial_fd   = None
         self.name        = name
         self.baudrate    = baudrate
         self.timeout     = timeout
                 
-        # HDLC driver
-        self.hdlc = Hdlc()
-        
-        # Receive variables
-        self.receive_buffer    = []
-        self.receive_message   = []
-        self.receive_condition = threading.Condition()
-        self.is_receiving      = False
-        self.rx_byte           = ''
-        self.last_rx_byte      = ''
-        
-        # Transmit variables 
-        self.transmit_buffer    = []
-        self.transmit_message   = []
-        self.transmit_condition = threading.Condition()
-
-        # Quality control variables
-        self.tx_total_frames = 0
-        self.tx_good_frames  = 0
-        self.tx_bad_frames   = 0
-        self.rx_total_frames = 0
-        self.rx_good_frames  = 0
-        self.rx_bad_frames   = 0
+        # Transmit variables, each thread transmitting has its own transmit buffer
+        self.transmit_local   = threading.local()
+        self.transmit_message = []
         
         try:
             logger.info("init: Opening the serial port on {} at {} bps.".format(self.name, self.baudrate))
@@ -68,6 +53,13 @@ class Serial(threading.Thread):
             raise Exception
         else:
             logger.info("init: Serial object created.")
+
+        # Get the file descriptor of the serial port to write to it directly,
+        # not available on all platforms (i.e. Windows raises UnsupportedOperation)
+        try:
+            self.serial_fd = self.serial_port.fileno()
+        except (AttributeError, io.UnsupportedOperation, serial.SerialException):
+            self.serial_fd = None
     
     # Runs the thread
     def run(self):
@@ -80,21 +72,26 @@ class Serial(threading.Thread):
         self.serial_port.flushInput()
         self.serial_port.flushOutput() 
         
+        # Bind the methods used on every read to locals, in_waiting is a
+        # property so bind its getter to skip the descriptor lookup
+        serial_port = self.serial_port
+        read        = serial_port.read
+        in_waiting  = type(serial_port).in_waiting.fget
+        is_stopped  = self.stop_event.is_set
+        find_frames = self.framer.find_frames
+
         # Execute while thread is alive
-        while (not self.stop_event.isSet()):
-            rx_bytes = []
-            rx_length = 0
+        while (not is_stopped()):
+            rx_bytes = b''
 
             try:
-                # Read the number of bytes available
-                rx_length = self.serial_port.in_waiting
+                # Read the bytes available in a single call, or block until
+                # the first byte arrives if there are none (or timeout)
+                rx_length = in_waiting(serial_port)
+                rx_bytes = read(size = max(1, rx_length))
 
-                # If bytes are available read them
-                if (rx_length > 0):
-                    logger.debug("run: Read {} bytes from serial port on {}.".format(rx_length, self.serial_port))
-                    
-                    # Try to receive a byte from the serial port (blocking)
-                    rx_bytes = self.serial_port.read(size = rx_length)
+                if ((rx_bytes) and (self.framer.is_debug)):
+                    logger.debug("run: Read {} bytes from serial port on {}.".format(len(rx_bytes), self.serial_port))
 
             except:
                 logger.error("run: Error while receiving from the serial port on {}.".format(self.serial_port))
@@ -103,85 +100,11 @@ class Serial(threading.Thread):
                 # Break the loop
                 break
 
-            # Iterate over received bytes
-            for rx_byte in rx_bytes:
-                # Recover byte
-                self.rx_byte = rx_byte
-
-                # Start of frame
-                if ((not self.is_receiving) and 
-                    (self.last_rx_byte == self.hdlc.HDLC_FLAG) and
-                    (self.rx_byte != self.hdlc.HDLC_FLAG)):
-                    logger.debug("run: Start of HDLC frame.")
-                    
-                    self.is_receiving = True
-                    self.receive_buffer = []
-                    self.receive_buffer.append(self.hdlc.HDLC_FLAG)
-                    self.receive_buffer.append(self.rx_byte)
-                    
-                # Middle of HDLC frame
-                elif ((self.is_receiving) and
-                      (self.rx_byte != self.hdlc.HDLC_FLAG)):
-                    logger.debug("run: Middle of HDLC frame.")
-                    
-                    self.receive_buffer.append(self.rx_byte)
-                    
-                # End of HDLC frame 
-                elif ((self.is_receiving) and
-                      (self.rx_byte == self.hdlc.HDLC_FLAG)):
-                    logger.debug("run: End of HDLC frame.")
+            # Find the HDLC frames in the received bytes
+            find_frames(rx_bytes)
 
-                    # Receive the last byte
-                    self.receive_buffer.append(self.rx_byte)
-                    
-                    # Reset the variables
-                    self.is_receiving = False
-                    self.last_rx_byte = ''
-                    self.rx_byte = ''
-                    
-                    # Compute statistics
-                    self.rx_total_frames += 1
-                    
-                    try:
-                        logger.debug("run: Received an HDLC frame from the Serial port, now de-HDLCifying it.")
-                        
-                        # Receive me
-                        self.receive_message = self.hdlc.dehdlcify(self.receive_buffer)
-
-                        # Compute statistics
-                        self.rx_good_frames += 1
-                    except:
-                        logger.error("run: Error while de-HDLCifying the frame received from the Serial port.")
-                        
-                        # Clean buffers
-                        self.receive_buffer  = []
-                        self.receive_message = []
-
-                        # Compute statistics
-                        self.rx_bad_frames += 1
-
-                    else:
-                         # Acquire the receive condition
-                        self.receive_condition.acquire()                   
-                        
-                         # Notify the receive condition
-                        self.receive_condition.notify()
-                        
-                         # Release the transmit condition
-                        self.receive_condition.release()
-                        
-                        # Reset the receive buffer
-                        self.receive_buffer = []
-                    
-                # Always save the last received byte
-                self.last_rx_byte = self.rx_byte
-
-            # If no bytes were received, sleep
-            if (rx_length == 0):
-                # Sleep for a while
-                time.sleep(self.timeout)
-
-        # Close the serial port
+        # Close the serial port, its file descriptor is no longer valid
+        self.serial_fd = None
         self.serial_port.close()
     
     # Stops the thread
@@ -194,28 +117,19 @@ class Serial(threading.Thread):
     # Receive a message
     def receive(self, timeout = 0.1):
         status  = True
-        message = []
+        message = bytearray()
         length  = -1
         
-        # Acquire the lock
-        self.receive_condition.acquire()
-        
         # Try to receive a message with timeout
-        self.receive_condition.wait(timeout)
-
-        # If we really got a message, copy it!
-        if (self.receive_message):
-            message = self.receive_message
-            length  = len(message)
+        try:
+            message = self.receive_queue.get(timeout = timeout)
+        except queue.Empty:
+            pass
+        else:
+            length = len(message)
 
             logger.info("receive: Received a message with {} bytes.".format(length))
         
-        # Reset the receive message
-        self.receive_message = []
-        
-        # Release the receive condition
-        self.receive_condition.release()
-        
         # Get the status of the thread
         status = self.stop_event.isSet()
         
@@ -232,21 +146,23 @@ class Serial(threading.Thread):
         try:
             logger.debug("transmit: HDLCifying the transmit buffer.")
         
-            # HDLCify the message
-            self.transmit_buffer = self.hdlc.hdlcify(message)
-        except:
-            logger.error("transmit: Error HDLCifying the transmit buffer.")
-            # Compute statistics
-            self.tx_bad_frames += 1
-            raise
+            # Get the transmit buffer of this thread, replaced by a larger one
+            # if needed, as it is never resized while a view of it may be alive
+            transmit_buffer = getattr(self.transmit_local, "buffer", None)
+            transmit_length = self.hdlc.hdlcify_length(message)
+            if ((transmit_buffer == None) or (len(transmit_buffer) < transmit_length)):
+                transmit_buffer = bytearray(max(MAX_HDLC_FRAME, transmit_length))
+                self.transmit_local.buffer = transmit_buffer
 
-        try:
-            logger.debug("run: Transmitting the message with {} bytes.".format(len(self.transmit_buffer)))
+            # HDLCify the message into the transmit buffer
+            transmit_length = self.hdlc.hdlcify_into(message, transmit_buffer)
+
+            logger.debug("transmit: Transmitting the message with {} bytes.".format(transmit_length))
         
             # Send the message through the serial port (blocking)
-            self.serial_port.write(self.transmit_buffer)
+            self.serial_write(memoryview(transmit_buffer)[:transmit_length])
         except:
-            logger.error("transmit: Error transmitting the transmit buffer.")
+            logger.error("transmit: Error HDLCifying or transmitting the transmit buffer.", exc_info = True)
             # Compute statistics
             self.tx_bad_frames += 1
             raise
@@ -254,15 +170,22 @@ class Serial(threading.Thread):
         # Compute statistics
         self.tx_good_frames += 1
 
-    def clear_statistics(self):
-        self.tx_total_frames = 0
-        self.tx_good_frames  = 0
-        self.tx_bad_frames   = 0
-        self.rx_total_frames = 0
-        self.rx_good_frames  = 0
-        self.rx_bad_frames   = 0
+    # Write a buffer to the serial port
+    def serial_write(self, buffer):
+        # Write to the file descriptor until the whole buffer is sent
+        view = memoryview(buffer)
+        while (len(view) > 0):
+            # Use pyserial if the file descriptor is not available or the port
+            # was closed, checked on every write as the descriptor is then dead
+            serial_fd = self.serial_fd
+            if ((serial_fd == None) or (not self.serial_port.is_open)):
+                self.serial_port.write(view)
+                break
 
-    def get_statistics(self):
-        return "TX Total={}, TX Good={}, TX Bad={}, RX Total={}, RX Good={}, RX Bad={}".format(
-            self.tx_total_frames, self.tx_good_frames, self.tx_bad_frames,
-            self.rx_total_frames, self.rx_good_frames, self.rx_bad_frames)
+            try:
+                written = os.write(serial_fd, view)
+            except BlockingIOError:
+                # Output buffer is full, let pyserial wait for it to drain
+                self.serial_port.write(view)
+                break
+            view = view[written:]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libraries
+import asyncio
+import logging
+import queue
+
+# Import OpenMote libraries
+from Hdlc import Hdlc
+from Framer import Framer
+
+# Import logging configuration
+logger = logging.getLogger(__name__)
+
+# Maximum number of received messages waiting to be read
+MAX_RECEIVE_QUEUE = 16
+
+# Common receive handling and statistics of the serial ports
+# Turns the HDLC frames found by the framer into messages put on receive_queue,
+# either a queue.Queue or an asyncio.Queue, dropping the oldest one if full
+class SerialReceiver(object):
+
+    def __init__(self, receive_queue = None):
+        assert receive_queue != None, logger.error("SerialReceiver queue not defined.")
+
+        # HDLC driver
+        self.hdlc = Hdlc()
+
+        # HDLC framer
+        self.framer = Framer(self.receive_frame, self.receive_error)
+
+        # Receive variables
+        self.receive_queue = receive_queue
+
+        # Quality control variables
+        self.clear_statistics()
+
+    # Receives an HDLC frame found by the framer
+    def receive_frame(self, frame):
+        # Compute statistics
+        self.rx_total_frames += 1
+
+        try:
+            if (self.framer.is_debug):
+                logger.debug("receive_frame: Received an HDLC frame from the Serial port, now de-HDLCifying it.")
+
+            # Receive me
+            receive_message = self.hdlc.dehdlcify(frame)
+
+            # Compute statistics
+            self.rx_good_frames += 1
+        except:
+            logger.error("receive_frame: Error while de-HDLCifying the frame received from the Serial port.")
+
+            # Compute statistics
+            self.rx_bad_frames += 1
+
+        else:
+            # Hand the message to the receiver, dropping the oldest one if full
+            try:
+                self.receive_queue.put_nowait(receive_message)
+            except (queue.Full, asyncio.QueueFull):
+                logger.warning("receive_frame: Receive queue full, dropping the oldest message.")
+                try:
+                    self.receive_queue.get_nowait()
+                except (queue.Empty, asyncio.QueueEmpty):
+                    pass
+                self.receive_queue.put_nowait(receive_message)
+
+    # Receives an error from the framer, the HDLC frame was dropped
+    def receive_error(self):
+        # Compute statistics
+        self.rx_total_frames += 1
+        self.rx_bad_frames   += 1
+
+    def clear_statistics(self):
+        self.tx_total_frames = 0
+        self.tx_good_frames  = 0
+        self.tx_bad_frames   = 0
+        self.rx_total_frames = 0
+        self.rx_good_frames  = 0
+        self.rx_bad_frames   = 0
+
+    def get_statistics(self):
+        return "TX Total={}, TX Good={}, TX Bad={}, RX Total={}, RX Good={}, RX Bad={}".format(
+            self.tx_total_frames, self.tx_good_frames, self.tx_bad_frames,
+            self.rx_total_frames, self.rx_good_frames, self.rx_bad_frames)